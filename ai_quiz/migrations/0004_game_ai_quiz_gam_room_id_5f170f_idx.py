@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-15 17:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0003_topic_rename_text_question_question_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="game",
+            index=models.Index(
+                fields=["room", "status"], name="ai_quiz_gam_room_id_5f170f_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-15 17:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("ai_quiz", "0004_game_ai_quiz_gam_room_id_5f170f_idx"),
+        ("users", "0003_remove_user_role"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="participant",
+            index=models.Index(
+                fields=["room", "status"], name="ai_quiz_par_room_id_ea93ea_idx"
+            ),
+        ),
+    ]
@@ -91,6 +91,9 @@ class Game(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     current_question = models.IntegerField(default=0)
 
+    class Meta:
+        indexes = [models.Index(fields=["room", "status"])]
+
     def __str__(self):
         return f"{self.id}-{self.status}"
 
@@ -171,6 +174,9 @@ class Participant(models.Model):
     score = models.IntegerField(default=0)
     status = models.CharField(max_length=10, default="waiting", choices=STATUS_CHOICES)
 
+    class Meta:
+        indexes = [models.Index(fields=["room", "status"])]
+
     def __str__(self):
         return f"Participant for Room {self.room.room_id}"
 
@@ -1,12 +1,38 @@
+import copy
+
 from rest_framework import serializers
 
 from ai_quiz.models import Question
 
 
+def cache_fields(serializer_class):
+    """
+    Cache the fields built by `get_fields` on the serializer class.
+
+    `ModelSerializer.get_fields` introspects the model on every instantiation.
+    The generated fields only depend on the class, so build them once and hand
+    each instance its own copies to bind.
+    """
+    get_fields = serializer_class.get_fields
+    cached_fields = {}
+
+    def _get_fields(self):
+        if self.__class__ not in cached_fields:
+            cached_fields[self.__class__] = get_fields(self)
+        return {
+            name: copy.deepcopy(field)
+            for name, field in cached_fields[self.__class__].items()
+        }
+
+    serializer_class.get_fields = _get_fields
+    return serializer_class
+
+
 class ErrorSerializer(serializers.Serializer):
     error = serializers.CharField(max_length=100)
 
 
+@cache_fields
 class QuestionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Question
@@ -48,9 +74,11 @@ class JoinRoomResponseSerializer(serializers.Serializer):
 class CreateGameRequestSerializer(serializers.Serializer):
     roomCode = serializers.CharField(max_length=8)
     topic = serializers.CharField(max_length=100)
-    subtopics = serializers.ListField(child=serializers.CharField(max_length=100))
-    n = serializers.IntegerField()
-    difficulty = serializers.CharField(max_length=10)
+    subtopics = serializers.ListField(
+        child=serializers.CharField(max_length=100), allow_empty=False
+    )
+    n = serializers.IntegerField(default=5, min_value=1)
+    difficulty = serializers.CharField(max_length=10, default="easy")
 
 
 class CreateGameResponseSerializer(serializers.Serializer):
@@ -67,6 +95,7 @@ class StartGameResponseSerializer(serializers.Serializer):
 
 class EndGameRequestSerializer(serializers.Serializer):
     roomCode = serializers.CharField(max_length=8)
+    gameId = serializers.UUIDField()
 
 
 class SubtopicsRequestSerializer(serializers.Serializer):
@@ -1 +1,64 @@
-# Create your tests here.
+import csv
+import json
+import uuid
+
+from django.test import SimpleTestCase
+
+from ai_quiz.ai import Question as GeneratedQuestion
+from ai_quiz.models import Game, Question, Topic
+from ai_quiz.views.games import CreateGameView
+
+
+class BuildQuestionsCopyTests(SimpleTestCase):
+    def setUp(self):
+        self.game = Game(id=uuid.uuid4())
+        self.topic = Topic(id=7, name="Nepal")
+
+    def build(self, questions):
+        sql, buffer = CreateGameView._build_questions_copy(
+            self.game, self.topic, questions
+        )
+        return sql, buffer.getvalue()
+
+    def test_columns_match_bulk_create_fields(self):
+        sql, payload = self.build(
+            [
+                GeneratedQuestion(
+                    subtopic="Geography",
+                    question="What is the capital of Nepal?",
+                    answer="Kathmandu",
+                    options=["Kathmandu", "Pokhara"],
+                )
+            ]
+        )
+        columns = sql[sql.index("(") + 1 : sql.index(")")].split(", ")
+        self.assertTrue(sql.startswith(f"COPY {Question._meta.db_table} "))
+        self.assertTrue(sql.endswith("FROM STDIN WITH CSV"))
+
+        row = dict(zip(columns, next(csv.reader(payload.splitlines()))))
+        self.assertEqual(
+            row,
+            {
+                "game_id": str(self.game.id),
+                "topic_id": "7",
+                "subtopic": "Geography",
+                "question": "What is the capital of Nepal?",
+                "correct_answer": "Kathmandu",
+                "options": json.dumps(["Kathmandu", "Pokhara"]),
+                "timer": "30",
+                "created_at": row["created_at"],
+            },
+        )
+
+    def test_empty_strings_are_quoted(self):
+        _, payload = self.build(
+            [GeneratedQuestion(subtopic="", question="", answer="", options=[])]
+        )
+        fields = payload.rstrip("\r\n").split(",")
+        self.assertEqual(fields[2:5], ['""', '""', '""'])
+
+    def test_none_is_written_bare(self):
+        question = GeneratedQuestion(subtopic="", question="Q", answer="A", options=[])
+        question.subtopic = None
+        _, payload = self.build([question])
+        self.assertEqual(payload.split(",")[2], "")
@@ -1,24 +1,57 @@
+import asyncio
+import csv
+import hashlib
+import io
+import itertools
+import json
 import logging
 
 from adrf.views import APIView as AsyncAPIView
 from channels.db import database_sync_to_async
-from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Exists
+from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import status
+from rest_framework import serializers, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.views import APIView
 from ai_quiz.ai import generate_questions, generate_subtopics
-from ai_quiz.models import Game, Question, Room, Topic
+from ai_quiz.models import Game, Participant, Question, Room, Topic
 from ai_quiz.serializers import (
     CreateGameRequestSerializer,
     CreateGameResponseSerializer,
+    EndGameRequestSerializer,
     StartGameRequestSerializer,
     StartGameResponseSerializer,
 )
 
 logger = logging.getLogger(__name__)
-User = get_user_model()
+
+# Rows per INSERT when bulk creating questions; keeps each statement well under
+# the database's bound-parameter limit for large `n`
+QUESTION_BATCH_SIZE = 100
+# From this many questions on, load them with Postgres COPY instead of INSERT
+QUESTION_COPY_THRESHOLD = 50
+# Maximum number of concurrent question generation requests to the LLM
+QUESTION_GENERATION_CONCURRENCY = 4
+# Room columns consulted by the game views; the rest are deferred
+ROOM_FIELDS = ("room_id", "room_code", "status", "host")
+# Subtopics for a topic rarely change, so avoid regenerating them for a day
+SUBTOPICS_CACHE_TIMEOUT = 60 * 60 * 24
+# How long repeated end requests for a room are answered without the database
+GAME_ENDED_CACHE_TIMEOUT = 30
+
+
+# The request serializers carry no per-request state or context, so validate
+# every request against a single shared instance with `run_validation`
+CREATE_GAME_REQUEST = CreateGameRequestSerializer()
+START_GAME_REQUEST = StartGameRequestSerializer()
+END_GAME_REQUEST = EndGameRequestSerializer()
+
+
+def _game_ended_cache_key(room_code: str, game_id: str) -> str:
+    return f"game_ended:{room_code}:{game_id}"
 
 
 class CreateGameView(AsyncAPIView):
@@ -26,40 +59,93 @@ class CreateGameView(AsyncAPIView):
 
     async def validate_room(self, room_code):
         """Validate the room code and return the room object."""
-        try:
-            room = await Room.objects.aget(room_code=room_code, status="active")
-        except Room.DoesNotExist:
-            return None
-        return room
+        return (
+            await Room.objects.filter(room_code=room_code, status="active")
+            .only(*ROOM_FIELDS)
+            .afirst()
+        )
 
     async def validate_game(self, room: Room):
         """Validate if a game is already in progress."""
-        try:
-            game = Game.objects.aget(room=room, status="in_progress")
-            return game
-        except Game.DoesNotExist:
-            return None
+        return (
+            await Game.objects.filter(room=room, status="in_progress")
+            .only("id")
+            .afirst()
+        )
 
     async def create_game(self, room, topic, n, difficulty):
         """Create a new game object associated with the room."""
         game = await Game.objects.acreate(room=room, status="waiting")
-        subtopics = await generate_subtopics(topic)
+        subtopics = await self._get_subtopics(topic)
         await self._fetch_and_create_questions(
             game=game,
             topic=topic,
-            subtopics=subtopics.subtopics,
+            subtopics=subtopics,
             n=n,
             difficulty=difficulty,
         )
         return game.id
 
+    async def _get_subtopics(self, topic: str) -> list[str]:
+        """Get the subtopics for a topic, generating them only on a cache miss."""
+        cache_key = f"subtopics:{hashlib.sha256(topic.lower().encode()).hexdigest()}"
+        subtopics = await cache.aget(cache_key)
+        if subtopics is None:
+            subtopics = (await generate_subtopics(topic)).subtopics
+            # Don't let one empty response stick for the whole timeout
+            if subtopics:
+                await cache.aset(cache_key, subtopics, SUBTOPICS_CACHE_TIMEOUT)
+        return subtopics
+
     async def _get_or_create_topic(self, topic, subtopics):
         """Get or create a topic object with the given subtopics."""
         topic, _ = await Topic.objects.aget_or_create(name=topic)
-        topic.subtopics = list(set(subtopics)) + list(set(topic.subtopics))
-        await topic.asave()
+        # Merge and deduplicate in one pass, keeping the first-seen order
+        topic.subtopics = list(
+            dict.fromkeys(itertools.chain(subtopics, topic.subtopics or []))
+        )
+        await topic.asave(update_fields=["subtopics"])
         return topic
 
+    async def _generate_questions(
+        self,
+        topic: str,
+        subtopics: list[str],
+        n: int,
+        difficulty: str,
+    ):
+        """Generate `n` questions, requesting each subtopic's share concurrently."""
+        if not subtopics:
+            # Nothing to split across, so leave it to a single request
+            questions = await generate_questions(
+                topic=topic,
+                subtopics=subtopics,
+                n=n,
+                difficulty=difficulty,
+            )
+            return questions.questions
+
+        # Spread the questions as evenly as possible across the subtopics
+        shares = [
+            (subtopic, n // len(subtopics) + (i < n % len(subtopics)))
+            for i, subtopic in enumerate(subtopics)
+        ]
+        semaphore = asyncio.Semaphore(QUESTION_GENERATION_CONCURRENCY)
+
+        async def generate(subtopic, share):
+            async with semaphore:
+                return await generate_questions(
+                    topic=topic,
+                    subtopics=[subtopic],
+                    n=share,
+                    difficulty=difficulty,
+                )
+
+        results = await asyncio.gather(
+            *(generate(subtopic, share) for subtopic, share in shares if share > 0)
+        )
+        return [question for result in results for question in result.questions]
+
     async def _fetch_and_create_questions(
         self,
         game: Game,
@@ -69,13 +155,21 @@ class CreateGameView(AsyncAPIView):
         difficulty: str,
     ):
         """Fetch questions from the AI backend and create question objects."""
-        questions = await generate_questions(
+        questions = await self._generate_questions(
             topic=topic,
             subtopics=subtopics,
             n=n,
             difficulty=difficulty,
         )
-        questions = await Question.objects.abulk_create(
+        # Resolve the topic once; every generated question shares it
+        topic_obj = await self._get_or_create_topic(topic, subtopics)
+        if (
+            len(questions) >= QUESTION_COPY_THRESHOLD
+            and connection.vendor == "postgresql"
+        ):
+            await self._copy_questions(game, topic_obj, questions)
+            return
+        await Question.objects.abulk_create(
             [
                 Question(
                     game=game,
@@ -83,16 +177,67 @@ class CreateGameView(AsyncAPIView):
                     question=question.question,
                     correct_answer=question.answer,
                     options=question.options,
-                    topic=await self._get_or_create_topic(topic, subtopics),
+                    topic=topic_obj,
                 )
-                for question in questions.questions
-            ]
+                for question in questions
+            ],
+            batch_size=QUESTION_BATCH_SIZE,
         )
-        return questions
+
+    @staticmethod
+    def _build_questions_copy(game: Game, topic: Topic, questions):
+        """Build the COPY statement and CSV payload for the generated questions."""
+        # COPY skips the model layer, so fill in the Python-side defaults here
+        timer = Question._meta.get_field("timer").get_default()
+        created_at = timezone.now()
+        buffer = io.StringIO()
+        # Quote empty strings so Postgres only reads a bare empty field as NULL
+        writer = csv.writer(buffer, quoting=csv.QUOTE_NOTNULL)
+        for question in questions:
+            writer.writerow(
+                [
+                    game.id,
+                    topic.id,
+                    question.subtopic,
+                    question.question,
+                    question.answer,
+                    json.dumps(question.options),
+                    timer,
+                    created_at.isoformat(),
+                ]
+            )
+        buffer.seek(0)
+
+        columns = ", ".join(
+            Question._meta.get_field(name).column
+            for name in (
+                "game",
+                "topic",
+                "subtopic",
+                "question",
+                "correct_answer",
+                "options",
+                "timer",
+                "created_at",
+            )
+        )
+        sql = f"COPY {Question._meta.db_table} ({columns}) FROM STDIN WITH CSV"
+        return sql, buffer
 
     @database_sync_to_async
-    def validate_user(self, room, request):
-        return request.user == room.host
+    def _copy_questions(self, game: Game, topic: Topic, questions):
+        """Bulk load generated questions with a single Postgres COPY."""
+        sql, buffer = self._build_questions_copy(game, topic, questions)
+        with connection.cursor() as cursor:
+            if hasattr(cursor.cursor, "copy_expert"):  # psycopg2
+                cursor.copy_expert(sql, buffer)
+            else:  # psycopg 3
+                with cursor.copy(sql) as copy:
+                    copy.write(buffer.getvalue())
+
+    async def validate_user(self, room, request):
+        """Check if the requesting user hosts the room."""
+        return room.host_id == request.user.id
 
     @swagger_auto_schema(
         request_body=CreateGameRequestSerializer,
@@ -102,23 +247,14 @@ class CreateGameView(AsyncAPIView):
         operation_description="Create a room with a custom serializer",
     )
     async def post(self, request, *args, **kwargs):
-        room_code = request.data.get("roomCode")
-        topic = request.data.get("topic")
-        subtopics = request.data.get("subtopics")
-        n = request.data.get("n", 5)
-        difficulty = request.data.get("difficulty", "easy")
-        if not topic or not subtopics:
-            return Response(
-                {
-                    "error": "`topic` and `subtopics` are required; `n` and `difficulty` are optional."
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        if not room_code:
-            return Response(
-                {"error": "roomCode is required"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        try:
+            data = CREATE_GAME_REQUEST.run_validation(request.data)
+        except serializers.ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        room_code = data["roomCode"]
+        topic = data["topic"]
+        n = data["n"]
+        difficulty = data["difficulty"]
 
         # Check if the room exists
         room = await self.validate_room(room_code)
@@ -128,13 +264,17 @@ class CreateGameView(AsyncAPIView):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
-        # Check if the requesting user is the host
-        if not await self.validate_user(room, request):
+        # Check if the requesting user is the host and whether a game is already
+        # in progress; both only depend on the room so they can run concurrently
+        is_host, game = await asyncio.gather(
+            self.validate_user(room, request),
+            self.validate_game(room),
+        )
+        if not is_host:
             return Response(
                 {"error": "Only the host can create the game."},
                 status=status.HTTP_403_FORBIDDEN,
             )
-        game = await self.validate_game(room)
 
         # There is already a game in progress
         if game is not None:
@@ -152,9 +292,32 @@ class CreateGameView(AsyncAPIView):
         return Response(response_data, status=status.HTTP_201_CREATED)
 
 
-class StartGameView(APIView):
+class StartGameView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
+    async def get_waiting_games(self, room: Room):
+        """Return the games in the room that are waiting to be started."""
+        return [game async for game in room.games.filter(status="waiting")[:2]]
+
+    @database_sync_to_async
+    def start_game(self, game: Game):
+        """
+        Mark the game as in progress if every participant is ready.
+
+        The readiness check is part of the UPDATE itself, so checking and
+        starting the game is a single statement. Returns whether it started.
+        """
+        unready = Participant.objects.filter(room=game.room_id).exclude(status="ready")
+        with transaction.atomic():
+            started = (
+                Game.objects.filter(id=game.id, status="waiting")
+                .filter(~Exists(unready))
+                .update(status="in_progress")
+            )
+            if started:
+                game.create_leaderboard()
+        return bool(started)
+
     @swagger_auto_schema(
         request_body=StartGameRequestSerializer,
         responses={
@@ -162,84 +325,99 @@ class StartGameView(APIView):
         },
         operation_description="Create a room with a custom serializer",
     )
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         """Start the game."""
-        room_code = request.data.get("roomCode")
+        try:
+            data = START_GAME_REQUEST.run_validation(request.data)
+        except serializers.ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        room_code = data["roomCode"]
 
-        if not room_code:
+        # Fetch the room only if the requesting user hosts it
+        room = (
+            await Room.objects.filter(room_code=room_code, host=request.user)
+            .only(*ROOM_FIELDS)
+            .afirst()
+        )
+        if room is None:
+            # Tell a missing room apart from one hosted by someone else
+            if not await Room.objects.filter(room_code=room_code).aexists():
+                return Response(
+                    {"error": "Room not found."}, status=status.HTTP_404_NOT_FOUND
+                )
             return Response(
-                {"error": "roomCode is required"},
-                status=status.HTTP_400_BAD_REQUEST,
+                {"error": "Only the host can start the game."},
+                status=status.HTTP_403_FORBIDDEN,
             )
 
-        # Check if the room exists
-        try:
-            room = Room.objects.get(room_code=room_code)
-        except Room.DoesNotExist:
+        waiting_games = await self.get_waiting_games(room)
+        if not waiting_games:
             return Response(
-                {"error": "Room not found."}, status=status.HTTP_404_NOT_FOUND
+                {"error": "Create a game before starting."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-
-        # Check if the requesting user is the host
-        if room.host != request.user:
+        if len(waiting_games) > 1:
             return Response(
-                {"error": "Only the host can start the game."},
-                status=status.HTTP_403_FORBIDDEN,
+                {"error": "Multiple games with status 'waiting' found."},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        try:
-            # We need to check if all players are ready before starting the game
-            if room.participants.exclude(status="ready").exists():
-                return Response(
-                    {"error": "All participants must be ready to start the game."},
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            game = room.get_waiting_game()
-            game.create_leaderboard()
-            game.status = "in_progress"
-            game.save()
-        except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        game = waiting_games[0]
+        # We need to check if all players are ready before starting the game
+        if not await self.start_game(game):
+            return Response(
+                {"error": "All participants must be ready to start the game."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         response_data = {
             "gameId": game.id,
         }
         return Response(response_data, status=status.HTTP_200_OK)
 
 
-class EndGameView(APIView):
+class EndGameView(AsyncAPIView):
     permission_classes = [IsAuthenticated]
 
-    def post(self, request, *args, **kwargs):
+    async def post(self, request, *args, **kwargs):
         """End the game."""
-        room_code = request.data.get("roomCode")
-        game_id = request.data.get("gameId")
-        if not room_code or not game_id:
-            return Response(
-                {"error": "roomCode and gameId required"},
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # Check if the room exists
         try:
-            room = Room.objects.get(room_code=room_code)
-        except Room.DoesNotExist:
-            return Response(
-                {"error": "Room not found."}, status=status.HTTP_404_NOT_FOUND
-            )
+            data = END_GAME_REQUEST.run_validation(request.data)
+        except serializers.ValidationError as e:
+            return Response({"error": e.detail}, status=status.HTTP_400_BAD_REQUEST)
+        room_code = data["roomCode"]
+        game_id = data["gameId"]
 
-        # Check if the requesting user is the host
-        if room.host != request.user:
+        # Fetch the room only if the requesting user hosts it
+        room = (
+            await Room.objects.filter(room_code=room_code, host=request.user)
+            .only(*ROOM_FIELDS)
+            .afirst()
+        )
+        if room is None:
+            # Tell a missing room apart from one hosted by someone else
+            if not await Room.objects.filter(room_code=room_code).aexists():
+                return Response(
+                    {"error": "Room not found."}, status=status.HTTP_404_NOT_FOUND
+                )
             return Response(
                 {"error": "Only the host can end the game."},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # End the game (e.g., setting a game state, etc.)
-        try:
-            room.end_game()
-        except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
-        # Get the game instances that are in progress and end them
+        # Repeated end requests shortly after the game ended are a no-op
+        cache_key = _game_ended_cache_key(room_code, game_id)
+        if await cache.aget(cache_key):
+            return Response({"status": "game_ended"}, status=status.HTTP_200_OK)
+
+        # End the requested game, provided it is the one in progress in this room
+        ended = await Game.objects.filter(
+            id=game_id, room=room, status="in_progress"
+        ).aupdate(status="finished", ended_at=timezone.now())
+        if not ended:
+            return Response(
+                {"error": "No game in progress to end."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        await cache.aset(cache_key, True, GAME_ENDED_CACHE_TIMEOUT)
 
         return Response({"status": "game_ended"}, status=status.HTTP_200_OK)
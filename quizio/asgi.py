@@ -9,14 +9,31 @@ from channels.routing import ProtocolTypeRouter, URLRouter
 from channels.auth import AuthMiddlewareStack
 
 asgi_application = get_asgi_application()
-from ai_quiz.consumers.routing import websocket_urlpatterns
-# ASGI application # Import the consumer you will create
 
+
+class LazyWebsocketApplication:
+    """
+    Build the websocket application on the first websocket connection.
+
+    Importing the consumers pulls in the event handlers and everything they
+    depend on, which HTTP-only workers never need.
+    """
+
+    def __init__(self):
+        self.application = None
+
+    async def __call__(self, scope, receive, send):
+        if self.application is None:
+            from ai_quiz.consumers.routing import websocket_urlpatterns
+
+            self.application = AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        return await self.application(scope, receive, send)
+
+
+# ASGI application
 application = ProtocolTypeRouter(
     {
         "http": asgi_application,  # Handles regular HTTP requests
-        "websocket": AuthMiddlewareStack(  # Handles WebSocket requests
-            URLRouter(websocket_urlpatterns)
-        ),
+        "websocket": LazyWebsocketApplication(),  # Handles WebSocket requests
     }
 )
@@ -169,6 +169,13 @@ DEFAULT_FROM_EMAIL = "your-email@example.com"
 ASGI_APPLICATION = "quizio.asgi.application"
 
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://127.0.0.1:6379/1",  # Shared across ASGI workers
+    },
+}
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",